@@ -1,10 +1,41 @@
 import streamlit as st
+import hashlib
 import re
 from typing import Dict, List, Union
 from datetime import datetime
 
+_VERSION_RE = re.compile(r'(?i)version\s*:?-?\s*(\d+\.\d+(\.\d+)?)')
+_DATE_RE = re.compile(r'(?i)date\s*:?-?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\w+\s+\d{1,2},?\s+\d{4})')
+# Line-anchored "Field: value" metadata (authors and status) share one regex
+_FIELD_RE = re.compile(r'(?i)^(?P<kind>author|by|prepared by|status)\s*:?-?\s*(?P<val>.+)')
+_FIELD_PREFIXES = ('author', 'by', 'prepared', 'status')
+_SUMMARY_HDR_RE = re.compile(r'(?i)(executive summary|introduction|overview)')
+_SECTION_STOP_RE = re.compile(r'^(\d+\.|[A-Z][a-z]+\s+\d+)')
+_BULLET_RE = re.compile(r'^[•\-\*]\s+')
+_NUM_RE = re.compile(r'^\d+\.\s+')
+_BULLETS = frozenset('•-*')
+
+# Upper bounds on collected list fields; only the first entries are shown and fed to the AI prompt
+MAX_KEY_POINTS = 50
+MAX_AUTHORS = 20
+MAX_SUMMARY_CHARS = 2000
+
 def extract_document_info(text: Union[str, List[Union[str, dict]]]) -> Dict:
     """Extract key information from the document. Accepts list (DOCX) or string (PDF/TXT)."""
+    if isinstance(text, list):
+        return _extract_from_blocks(text)
+    return _extract_from_string(text)
+
+def _extract_from_blocks(blocks: List[Union[str, dict]]) -> Dict:
+    # DOCX: paragraphs interleaved with table dicts; keep the non-empty paragraphs
+    return _scan_lines([line for line in (b.strip() for b in blocks if isinstance(b, str)) if line])
+
+def _extract_from_string(text: str) -> Dict:
+    # PDF/TXT: one line per paragraph
+    return _scan_lines([line for line in (l.strip() for l in text.split('\n')) if line])
+
+def _scan_lines(lines: List[str]) -> Dict:
+    """Collect document info from stripped, non-empty lines."""
     info = {
         'title': '',
         'version': '',
@@ -15,65 +46,79 @@ def extract_document_info(text: Union[str, List[Union[str, dict]]]) -> Dict:
         'key_points': []
     }
     
-    # If DOCX, text is a list of paragraphs/tables; if not, split into lines
-    if isinstance(text, list):
-        lines = [p.strip() for p in text if isinstance(p, str) and p.strip()]
-    else:
-        lines = [l.strip() for l in text.split('\n') if l.strip()]
-    
-    # Extract title (first non-empty paragraph, not all uppercase, not too short)
-    for line in lines[:10]:
-        if line and len(line) > 3 and not line.isupper() and not any(char.isdigit() for char in line[:8]):
-            info['title'] = line.strip()
-            break
-    
-    # Extract version and date
-    version_pattern = r'(?i)version\s*:?-?\s*(\d+\.\d+(\.\d+)?)'
-    date_pattern = r'(?i)date\s*:?-?\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\w+\s+\d{1,2},?\s+\d{4})'
-    
-    for line in lines:
+    # Single pass over the lines; cheap substring/prefix checks gate each regex
+    summary_state = 0  # 0: header not seen yet, 1: collecting, 2: done
+    for idx, line in enumerate(lines):
+        # Title (first non-empty paragraph, not all uppercase, not too short)
+        if idx < 10 and not info['title'] and len(line) > 3 and not line.isupper() and not any(char.isdigit() for char in line[:8]):
+            info['title'] = line
+
+        low = line.lower()
         # Version
-        version_match = re.search(version_pattern, line)
-        if version_match:
-            info['version'] = version_match.group(1)
+        if 'version' in low:
+            version_match = _VERSION_RE.search(line)
+            if version_match:
+                info['version'] = version_match.group(1)
         # Date
-        date_match = re.search(date_pattern, line)
-        if date_match:
-            info['date'] = date_match.group(1)
-        # Authors (look for patterns like "Author:", "By:", etc.)
-        author_match = re.match(r'(?i)^(author|by|prepared by)\s*:?-?\s*(.+)', line)
-        if author_match:
-            authors = [a.strip() for a in author_match.group(2).split(',') if len(a.strip()) > 1]
-            info['authors'].extend(authors)
-        # Status
-        status_match = re.match(r'(?i)^status\s*:?-?\s*(.+)', line)
-        if status_match:
-            info['status'] = status_match.group(1).strip()
-    
-    # Extract summary (look for a section header, then collect following paragraphs)
-    summary_section = False
-    for line in lines:
-        if re.search(r'(?i)(executive summary|introduction|overview)', line):
-            summary_section = True
+        if 'date' in low:
+            date_match = _DATE_RE.search(line)
+            if date_match:
+                info['date'] = date_match.group(1)
+        # Authors ("Author:", "By:", etc.) and status
+        if low.startswith(_FIELD_PREFIXES):
+            field_match = _FIELD_RE.match(line)
+            if field_match:
+                if field_match.group('kind').lower() == 'status':
+                    info['status'] = field_match.group('val').strip()
+                elif len(info['authors']) < MAX_AUTHORS:
+                    authors = [a.strip() for a in field_match.group('val').split(',') if len(a.strip()) > 1]
+                    info['authors'].extend(authors[:MAX_AUTHORS - len(info['authors'])])
+
+        # Summary (look for a section header, then collect following paragraphs); nothing is
+        # collected until a header is seen, and collection stops at the next section or the cap
+        if summary_state != 2:
+            if _SUMMARY_HDR_RE.search(line):
+                summary_state = 1
+            elif summary_state == 1:
+                if _SECTION_STOP_RE.match(line):  # Stop at next section
+                    summary_state = 2
+                else:
+                    info['summary'] += line + ' '
+                    if len(info['summary']) >= MAX_SUMMARY_CHARS:
+                        summary_state = 2
+
+        # Key points (look for bullet points or numbered lists); the first character
+        # decides which marker regex, if any, is worth running
+        if len(info['key_points']) >= MAX_KEY_POINTS:
             continue
-        if summary_section:
-            if re.match(r'^(\d+\.|[A-Z][a-z]+\s+\d+)', line):  # Stop at next section
-                break
-            info['summary'] += line.strip() + ' '
-    
-    # Extract key points (look for bullet points or numbered lists)
-    for line in lines:
-        if re.match(r'^[•\-\*]\s+', line) or re.match(r'^\d+\.\s+', line):
-            point = re.sub(r'^[•\-\*]\s+', '', line).strip()
-            point = re.sub(r'^\d+\.\s+', '', point).strip()
-            if point and len(point) > 10:
+        first = line[0]
+        if first in _BULLETS:
+            marker = _BULLET_RE.match(line)
+        elif first.isdigit():
+            marker = _NUM_RE.match(line)
+        else:
+            marker = None
+        if marker:
+            point = line[marker.end():]
+            if first in _BULLETS and point[:1].isdigit():
+                nested = _NUM_RE.match(point)
+                if nested:
+                    point = point[nested.end():]
+            if len(point) > 10:
                 info['key_points'].append(point)
     
     return info
 
+# Bounded so uploads do not accumulate in server memory for the life of the process
+@st.cache_data(max_entries=8, show_spinner=False)
+def _extract_document_info_cached(text_digest: bytes, _text: Union[str, List[Union[str, dict]]]) -> Dict:
+    # Keyed on the digest only; _text is excluded from Streamlit's hashing
+    return extract_document_info(_text)
+
 def render_document_info(text: Union[str, List[Union[str, dict]]]):
     """Render the extracted document information."""
-    info = extract_document_info(text)
+    text_digest = hashlib.blake2b(repr(text).encode(), digest_size=16).digest()
+    info = _extract_document_info_cached(text_digest, text)
     
     with st.container():
         st.markdown("### Document Information")
@@ -95,6 +140,5 @@ def render_document_info(text: Union[str, List[Union[str, dict]]]):
             st.write(info['summary'])
         if info['key_points']:
             st.markdown("### Key Points")
-            for point in info['key_points']:
-                st.markdown(f"• {point}")
+            st.markdown('\n'.join(f"- {point}" for point in info['key_points']))
         st.markdown("---") 
\ No newline at end of file
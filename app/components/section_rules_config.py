@@ -1,7 +1,8 @@
 import streamlit as st
-from typing import Dict, List, Tuple, Set
+from typing import Dict, Tuple, Set
+from ..models.template_index import TemplateIndex
 
-def render_section_rules_config(template_headings: List[Tuple[str, str]]) -> Tuple[Dict[str, str], Set[str]]:
+def render_section_rules_config(template_headings: TemplateIndex) -> Tuple[Dict[str, str], Set[str]]:
     """
     Render UI for configuring rules for each section.
     Returns a tuple of (section_rules_dict, mandatory_sections_set)
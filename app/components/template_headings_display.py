@@ -1,17 +1,110 @@
+import os
+import threading
+import zipfile
 import streamlit as st
-from docx import Document
+from lxml import etree
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+from docx.oxml.parser import element_class_lookup, parse_xml
+from docx.styles import BabelFish
 from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from ..models.template_index import TemplateIndex
 
-def extract_template_headings(template_path: str):
-    headings = []
+_BODY_TAG = qn('w:body')
+_PARAGRAPH_TAG = qn('w:p')
+_TABLE_TAG = qn('w:tbl')
+
+# Parsed templates keyed on (path, mtime); lives as long as the server process, so
+# reruns and sessions share one parse per template version
+_TEMPLATE_CACHE: Dict[Tuple[str, Optional[float]], Tuple[TemplateIndex, Dict[str, Tuple[str, ...]]]] = {}
+# Streamlit runs each session's script on its own thread
+_TEMPLATE_CACHE_LOCK = threading.Lock()
+
+def get_template(template_path: str) -> Tuple[TemplateIndex, Dict[str, Tuple[str, ...]]]:
+    """
+    Return the template's headings and the template's own text under each heading,
+    parsed once per template version.
+    """
+    key = (template_path, template_mtime(template_path))
+    with _TEMPLATE_CACHE_LOCK:
+        template = _TEMPLATE_CACHE.get(key)
+        if template is None:
+            try:
+                template = parse_template(template_path)
+            except Exception as e:
+                # Failures are not cached, so the error is shown on every rerun until fixed
+                st.error(f"Error reading template: {e}")
+                return TemplateIndex.from_headings(()), {}
+            for stale in [k for k in _TEMPLATE_CACHE if k[0] == template_path]:
+                _TEMPLATE_CACHE.pop(stale, None)
+            _TEMPLATE_CACHE[key] = template
+    return template
+
+def extract_template_headings(template_path: str) -> TemplateIndex:
+    """Return the template's (style, text) headings and their lookup."""
+    return get_template(template_path)[0]
+
+def template_mtime(template_path: str) -> Optional[float]:
+    """Modification time of the template, or None if it cannot be read."""
     try:
-        doc = Document(template_path)
-        for para in doc.paragraphs:
-            if para.style.name.startswith('Heading') and para.text.strip():
-                headings.append((para.style.name, para.text.strip()))
-    except Exception as e:
-        st.error(f"Error reading template: {e}")
-    return headings
+        return os.path.getmtime(template_path)
+    except OSError:
+        return None
+
+def iter_template_paragraphs(template_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (style name, text) for each top-level paragraph of a .docx, in document order.
+    Streams word/document.xml with iterparse instead of building python-docx's object model;
+    style names and paragraph text match what Document(...).paragraphs reports.
+    """
+    with zipfile.ZipFile(template_path) as archive:
+        style_names, default_style = _read_paragraph_styles(archive)
+        with archive.open('word/document.xml') as xml:
+            events = etree.iterparse(xml, events=('end',), tag=(_PARAGRAPH_TAG, _TABLE_TAG), remove_blank_text=True, resolve_entities=False)
+            events.set_element_class_lookup(element_class_lookup)
+            for _, el in events:
+                parent = el.getparent()
+                # Paragraphs nested in tables are released together with their table
+                if parent is None or parent.tag != _BODY_TAG:
+                    continue
+                if el.tag == _PARAGRAPH_TAG:
+                    yield style_names.get(el.style, default_style), el.text
+                el.clear()
+                while el.getprevious() is not None:
+                    del parent[0]
+
+def _read_paragraph_styles(archive: zipfile.ZipFile) -> Tuple[Dict[str, str], str]:
+    """Map paragraph style ids to UI style names, plus the default paragraph style name."""
+    if 'word/styles.xml' not in archive.namelist():
+        return {}, ''
+    styles = parse_xml(archive.read('word/styles.xml'))
+    style_names = {}
+    for style in styles.style_lst:
+        # The first style with a given id wins, as in python-docx
+        if style.styleId in style_names:
+            continue
+        style_names[style.styleId] = BabelFish.internal2ui(style.name_val or '') if style.type == WD_STYLE_TYPE.PARAGRAPH else None
+    default = styles.default_for(WD_STYLE_TYPE.PARAGRAPH)
+    default_style = BabelFish.internal2ui(default.name_val or '') if default is not None else ''
+    return {k: v for k, v in style_names.items() if v is not None}, default_style
+
+def parse_template(template_path: str) -> Tuple[TemplateIndex, Dict[str, Tuple[str, ...]]]:
+    """Read the template's headings and the text under each heading in a single pass."""
+    headings = []
+    section_content = {}
+    current = None
+    for style, text in iter_template_paragraphs(template_path):
+        stripped = text.strip()
+        if not stripped:
+            continue
+        if style.startswith('Heading'):
+            headings.append((style, stripped))
+            current = section_content[stripped] = []
+        elif current is not None:
+            current.append(text)
+    # Shared by every session through the cache, so hand out immutable tuples
+    return TemplateIndex.from_headings(headings), {h: tuple(lines) for h, lines in section_content.items()}
 
 def render_template_headings_display(template_path: str):
     st.markdown("### Template Sections (Headings)")
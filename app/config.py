@@ -17,6 +17,11 @@ APP_ICON = "📝"
 # File settings
 ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.txt'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+USE_PYMUPDF = os.getenv("USE_PYMUPDF", "").lower() in ("1", "true", "yes")  # requires `pip install pymupdf`
 
 # AI settings
-AI_MODEL = "gpt-3.5-turbo"  # or your preferred model 
\ No newline at end of file
+AI_MODEL = "gpt-3.5-turbo"  # or your preferred model
+
+# LLM response cache
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", BASE_DIR / "llm_cache.db"))
+LLM_CACHE_TTL_DAYS = 7
@@ -1,13 +1,17 @@
 import streamlit as st
+import asyncio
+import hashlib
 import os
-from typing import Dict, Set
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple, Union
 from app.config import APP_NAME, APP_ICON
 from app.services.file_service import FileService
 from app.services.bedrock_service import BedrockService
 from app.components.file_uploader import render_file_uploader
 from app.components.tech_spec_display import render_tech_spec_display, break_content_by_template_sections
 from app.components.doc_info_extractor import render_document_info
-from app.components.template_headings_display import render_template_headings_display, extract_template_headings
+from app.components.template_headings_display import render_template_headings_display, get_template
 from app.components.section_rules_config import render_section_rules_config
 from app.models.structured_doc import SectionContent, DocumentStructure
 
@@ -19,6 +23,17 @@ def get_aws_region() -> str:
         st.warning(f"Could not load AWS region from secrets: {str(e)}. Using default region.")
         return os.getenv("AWS_REGION", "us-east-1")
 
+@st.cache_resource
+def get_review_executor() -> ThreadPoolExecutor:
+    """Worker pool shared across reruns and sessions for AI reviews running in the background."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="ai-review")
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def extract_upload_text(upload_digest: bytes, _uploaded_file) -> Optional[Union[str, List[Union[str, Dict]]]]:
+    """Extracted text of an upload, parsed once rather than on every rerun."""
+    # Keyed on the digest only; _uploaded_file is excluded from Streamlit's hashing
+    return FileService.extract_text(_uploaded_file)
+
 def build_document_structure(text, template_headings) -> DocumentStructure:
     """Build a DocumentStructure object from extracted text and template headings."""
     section_map, _ = break_content_by_template_sections(text, template_headings)
@@ -28,13 +43,8 @@ def build_document_structure(text, template_headings) -> DocumentStructure:
     ]
     return DocumentStructure(sections=sections)
 
-def get_ai_prompt(doc_struct: DocumentStructure, section_rules: Dict[str, str], mandatory_sections: Set[str]) -> str:
-    """Generate the AI review prompt with custom section rules."""
-    context = (
-        "You are an expert technical reviewer. You are reviewing a technical specification document. "
-        "The document describes a solution to a specific problem or requirement."
-    )
-    
+def build_rules(headers: Tuple[str, ...], section_rules: Dict[str, str], mandatory_sections: Set[str]) -> str:
+    """Render the general and section-specific review rules for the AI prompt."""
     # Build rules section with custom rules for each section
     rules = ["General Rules:"]
     rules.extend([
@@ -52,14 +62,30 @@ def get_ai_prompt(doc_struct: DocumentStructure, section_rules: Dict[str, str],
     ])
     
     # Add section-specific rules
-    for section in doc_struct.sections:
-        if section.header in section_rules and section_rules[section.header]:
-            rules.append(f"\n{section.header}:")
-            if section.header in mandatory_sections:
+    for header in headers:
+        if header in section_rules and section_rules[header]:
+            rules.append(f"\n{header}:")
+            if header in mandatory_sections:
                 rules.append("    [MANDATORY SECTION]")
-            rules.extend([f"    {rule}" for rule in section_rules[section.header].split('\n') if rule.strip()])
+            rules.extend([f"    {rule}" for rule in section_rules[header].split('\n') if rule.strip()])
     
-    return doc_struct.to_ai_prompt(context=context, rules='\n'.join(rules))
+    return '\n'.join(rules)
+
+def get_ai_prompt(doc_struct: DocumentStructure, section_rules: Dict[str, str], mandatory_sections: Set[str]) -> str:
+    """Generate the AI review prompt with custom section rules."""
+    context = (
+        "You are an expert technical reviewer. You are reviewing a technical specification document. "
+        "The document describes a solution to a specific problem or requirement."
+    )
+    
+    # The rendered rules only change when the configured rules do, so reuse them across reruns
+    headers = tuple(section.header for section in doc_struct.sections)
+    rules_key = (headers, tuple(sorted(section_rules.items())), frozenset(mandatory_sections))
+    if st.session_state.get('rules_key') != rules_key:
+        st.session_state.rules_str = build_rules(headers, section_rules, mandatory_sections)
+        st.session_state.rules_key = rules_key
+    
+    return doc_struct.to_ai_prompt(context=context, rules=st.session_state.rules_str)
 
 def main():
     """Main entry point for the Streamlit app."""
@@ -67,7 +93,6 @@ def main():
     st.title(APP_NAME)
 
     aws_region = get_aws_region()
-    file_service = FileService()
     ai_service = BedrockService(region_name=aws_region)
     template_path = os.path.join("TechspecificationTemplate.docx")
 
@@ -75,12 +100,13 @@ def main():
     if not uploaded_file:
         return
 
-    text = file_service.extract_text(uploaded_file)
+    upload_digest = hashlib.blake2b(uploaded_file.getvalue(), digest_size=16).digest()
+    text = extract_upload_text(upload_digest, uploaded_file)
     if not text:
         st.error("Failed to extract text from the uploaded file.")
         return
 
-    template_headings = extract_template_headings(template_path)
+    template_headings, template_section_map = get_template(template_path)
     
     # Create document structure before tabs
     doc_struct = build_document_structure(text, template_headings)
@@ -99,7 +125,7 @@ def main():
         for section in doc_struct.sections:
             content.append(section.header)
             content.extend(section.content_blocks)
-        render_tech_spec_display(content, template_headings, template_path)
+        render_tech_spec_display(content, template_headings, template_section_map)
     
     with tab4:
         st.markdown("### AI Review")
@@ -109,18 +135,50 @@ def main():
             st.session_state.ai_review_done = False
             st.session_state.bedrock_request = None
             st.session_state.ai_response = None
+        if 'ai_future' not in st.session_state:
+            st.session_state.ai_future = None
+            st.session_state.ai_stream = []
+        
+        review_running = st.session_state.ai_future is not None
+        
+        # Get AI Score button; the review runs in a worker thread so the other tabs stay usable
+        get_score = st.button("Get AI Score", type="primary", disabled=review_running)
+        # Reviews are cached per prompt; this asks the model again and replaces the cached review
+        rerun_fresh = st.button("Re-run without cache", disabled=review_running)
+        if get_score or rerun_fresh:
+            ai_prompt = get_ai_prompt(doc_struct, section_rules, mandatory_sections)
+            st.session_state.ai_review_done = False
+            st.session_state.ai_stream = []
+            st.session_state.ai_future = get_review_executor().submit(
+                asyncio.run, ai_service.review_document(ai_prompt, st.session_state.ai_stream.append, no_cache=rerun_fresh)
+            )
         
-        # Get AI Score button
-        if st.button("Get AI Score", type="primary"):
-            with st.spinner("Generating AI review..."):
-                ai_prompt = get_ai_prompt(doc_struct, section_rules, mandatory_sections)
-                st.session_state.bedrock_request, st.session_state.ai_response = ai_service.review_document(ai_prompt)
-                doc_struct.update_from_ai_response(st.session_state.ai_response)
+        future = st.session_state.ai_future
+        if future is not None:
+            # Show partial output while Claude is still generating; a rerun triggered by
+            # another widget interrupts this loop and picks the same future up again
+            status = st.empty()
+            partial = st.empty()
+            while not future.done():
+                status.info("Generating AI review...")
+                partial.code(''.join(st.session_state.ai_stream))
+                time.sleep(0.5)
+            status.empty()
+            partial.empty()
+            # Clear the future first so a failed review is reported once and the button re-enables
+            st.session_state.ai_future = None
+            try:
+                st.session_state.bedrock_request, st.session_state.ai_response = future.result()
                 st.session_state.ai_review_done = True
-            st.success("AI review completed!")
+                st.success("AI review completed!")
+            except Exception as e:
+                st.session_state.ai_review_done = False
+                st.error(f"AI review failed: {str(e)}")
         
         # Display AI review if available
         if st.session_state.ai_review_done:
+            # doc_struct is rebuilt on every rerun, so reapply the stored review
+            doc_struct.update_from_ai_response(st.session_state.ai_response)
             st.markdown("#### Review Prompt")
             st.markdown("##### Complete Request to Claude")
             st.json(st.session_state.bedrock_request)
@@ -17,14 +17,17 @@ class SectionContent:
 
     def to_prompt_block(self) -> str:
         """Format this section as a prompt block for AI."""
-        block = f"---\nSection: {self.header}\nContent:\n"
+        parts = [f"---\nSection: {self.header}\nContent:\n"]
         for content in self.content_blocks:
             if isinstance(content, str):
-                block += content + "\n"
+                parts.append(content)
+                parts.append("\n")
             elif isinstance(content, dict) and content.get('type') == 'table':
-                block += "Table:\n" + content.get('text', '') + "\n"
-        block += "---\n"
-        return block
+                parts.append("Table:\n")
+                parts.append(content.get('text', ''))
+                parts.append("\n")
+        parts.append("---\n")
+        return ''.join(parts)
 
 class DocumentStructure:
     def __init__(
@@ -56,10 +59,9 @@ class DocumentStructure:
                 "- Provide a score (1-5) for each section based on quality and completeness.\n"
                 "- Suggest improvements if needed."
             )
-        prompt = f"Context:\n{context}\n\nRules:\n{rules}\n\nData:\n"
-        for section in self.sections:
-            prompt += section.to_prompt_block()
-        return prompt
+        parts = [f"Context:\n{context}\n\nRules:\n{rules}\n\nData:\n"]
+        parts.extend(section.to_prompt_block() for section in self.sections)
+        return ''.join(parts)
 
     def update_from_ai_response(self, ai_response: dict):
         """Update the structure with AI feedback (scores, comments, suggestions)."""
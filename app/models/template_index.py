@@ -0,0 +1,51 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, Mapping, Optional, Set, Tuple
+
+_HEADING_NUMBER_RE = re.compile(r'^(\d+(?:\.\d+)*)[.)]?\s+')
+
+def _heading_key(text: str) -> str:
+    """Whitespace-collapsed, lowercased text with leading numbering normalized ("7.2." / "7.2)" -> "7.2")."""
+    return _HEADING_NUMBER_RE.sub(r'\1 ', ' '.join(text.split()).lower())
+
+def _title_key(key: str) -> str:
+    return _HEADING_NUMBER_RE.sub('', key)
+
+@dataclass(frozen=True)
+class TemplateIndex:
+    """Template headings plus the lookup used to match document blocks against them, built once."""
+    headings: Tuple[Tuple[str, str], ...]  # (style, text)
+    heading_texts: Tuple[str, ...]
+    lower_map: Mapping[str, str]  # heading key -> original heading text
+
+    @classmethod
+    def from_headings(cls, headings: Tuple[Tuple[str, str], ...]) -> "TemplateIndex":
+        headings = tuple(headings)
+        heading_texts = tuple(text.strip() for _, text in headings)
+        # Numbered keys take precedence; a key without the numbering is only added as a
+        # fallback when that title is unique, so a repeated title ("5.1. Assumptions",
+        # "7.2. Assumptions") never resolves to the wrong section.
+        lower_map = {_heading_key(h): h for h in heading_texts}
+        title_keys: Dict[str, Set[str]] = {}
+        for key in lower_map:
+            title_keys.setdefault(_title_key(key), set()).add(key)
+        for title, keys in title_keys.items():
+            if len(keys) == 1:
+                lower_map.setdefault(title, lower_map[next(iter(keys))])
+        return cls(headings=headings, heading_texts=heading_texts, lower_map=lower_map)
+
+    def match(self, text: str) -> Optional[str]:
+        """Return the template heading matching a content block, or None (also for ambiguous titles)."""
+        key = _heading_key(text)
+        if not key:
+            return None
+        heading = self.lower_map.get(key)
+        if heading is None:
+            heading = self.lower_map.get(_title_key(key))
+        return heading
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.headings)
+
+    def __len__(self) -> int:
+        return len(self.headings)
@@ -1,77 +1,229 @@
-from typing import List, Dict
+from typing import AsyncIterator, Callable, List, Dict, Optional
+import asyncio
+import httpx
 import openai
 import json
+import time
+import tiktoken
+from functools import lru_cache
+from openai import AsyncOpenAI, OpenAI
 from ..models.annotation import Annotation
-from ..config import AI_MODEL
+from ..config import AI_MODEL, LLM_CACHE_PATH, LLM_CACHE_TTL_DAYS
+from .llm_cache import LLMCache, get_llm_cache
+from .prompts import CHUNK_REVIEW_SYSTEM_PROMPT, REVIEW_SYSTEM_PROMPT, SUMMARY_SYSTEM_PROMPT
+from .request_pool import RequestPool
+from .response_parser import extract_json
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    return tiktoken.encoding_for_model(model)
 
 class AIService:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        max_parallel_requests: int = 8,
+        max_requests_per_minute: int = 3500,
+        max_tokens_per_minute: int = 90000
+    ):
         if not api_key:
             raise ValueError("OpenAI API key is required")
-        openai.api_key = api_key
+        # Keeps concurrent calls under the account's RPM/TPM limits and retries 429s/transient errors
+        self.request_pool = RequestPool(
+            max_requests_per_minute=max_requests_per_minute,
+            max_tokens_per_minute=max_tokens_per_minute,
+            max_in_flight=max_parallel_requests,
+            retry_on=(openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError),
+            rate_limit_on=(openai.RateLimitError,)
+        )
+        # Created once so sync calls share one keep-alive connection pool
+        self.client = OpenAI(
+            api_key=api_key,
+            http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=20), timeout=60)
+        )
+        # One pooled async client for all concurrent calls; use it from a single event loop
+        self.async_client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=100))
+        )
+        self.cache = get_llm_cache(str(LLM_CACHE_PATH), LLM_CACHE_TTL_DAYS)
 
-    def review_document(self, prompt: str) -> Dict:
-        """Send the structured prompt to the AI and return a structured response as a dict."""
+    def review_document(self, prompt: str, no_cache: bool = False) -> Dict:
+        """
+        Send the structured prompt to the AI and return a structured response as a dict.
+        Responses are cached per prompt; no_cache skips the lookup and refreshes the entry.
+        """
         if not prompt:
             return {'overall_score': None, 'overall_comment': '', 'sections': []}
+        messages = self._review_messages(prompt)
+        cache_key = self._cache_key(messages)
+        if not no_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         try:
-            system_prompt = (
-                "You are a technical specification reviewer. "
-                "Return ONLY a valid JSON object with the following structure. "
-                "Do not include any explanation or extra text outside the JSON.\n"
-                "Example:\n"
-                "{\n"
-                "  \"overall_score\": 8,\n"
-                "  \"overall_comment\": \"The document is well-structured.\",\n"
-                "  \"sections\": [\n"
-                "    {\n"
-                "      \"header\": \"Introduction\",\n"
-                "      \"score\": 5,\n"
-                "      \"comment\": \"Clear and complete.\",\n"
-                "      \"suggestions\": \"\"\n"
-                "    },\n"
-                "    {\n"
-                "      \"header\": \"System Requirements\",\n"
-                "      \"score\": 3,\n"
-                "      \"comment\": \"Missing details on memory requirements.\",\n"
-                "      \"suggestions\": \"Add more details on hardware.\"\n"
-                "    }\n"
-                "  ]\n"
-                "}\n"
-            )
-            response = openai.ChatCompletion.create(
+            response = self.client.chat.completions.create(
                 model=AI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 temperature=0.7,
                 max_tokens=1500
             )
             content = response.choices[0].message.content
-            # Try to parse the response as JSON
-            try:
-                ai_response = json.loads(content)
-            except Exception:
-                # If the response is not valid JSON, try to extract JSON from the text
-                import re
-                match = re.search(r'\{.*\}', content, re.DOTALL)
-                if match:
-                    ai_response = json.loads(match.group(0))
-                else:
-                    ai_response = {'overall_score': None, 'overall_comment': content, 'sections': []}
-            return ai_response
+            return self._parse_and_cache(content, cache_key)
+        except Exception as e:
+            print(f"Error in document review: {str(e)}")
+            return {'overall_score': None, 'overall_comment': f"Error during review: {str(e)}", 'sections': []}
+
+    async def stream_review(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the review completion, yielding text deltas as they arrive."""
+        stream = await self.async_client.chat.completions.create(
+            model=AI_MODEL,
+            messages=self._review_messages(prompt),
+            temperature=0.7,
+            max_tokens=1500,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def review_document_async(
+        self,
+        prompt: str,
+        on_text: Optional[Callable[[str], None]] = None,
+        no_cache: bool = False
+    ) -> Dict:
+        """
+        Streaming variant of review_document. on_text, if given, is called with each text delta;
+        the JSON is only parsed once the completion has finished. Cache hits return without streaming.
+        """
+        if not prompt:
+            return {'overall_score': None, 'overall_comment': '', 'sections': []}
+        cache_key = self._cache_key(self._review_messages(prompt))
+        if not no_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        try:
+            parts = []
+            async for text in self.stream_review(prompt):
+                parts.append(text)
+                if on_text is not None:
+                    on_text(text)
+            return self._parse_and_cache(''.join(parts), cache_key)
         except Exception as e:
             print(f"Error in document review: {str(e)}")
             return {'overall_score': None, 'overall_comment': f"Error during review: {str(e)}", 'sections': []}
 
+    def submit_batch(self, prompts: List[str]) -> str:
+        """
+        Submit review prompts through the OpenAI Batch API and return the batch id.
+        Meant for offline/bulk re-reviews: half the cost of interactive calls, results within 24h.
+        """
+        requests = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": AI_MODEL,
+                    "messages": self._review_messages(prompt),
+                    "temperature": 0.7,
+                    "max_tokens": 1500
+                }
+            })
+            for i, prompt in enumerate(prompts)
+        ]
+        batch_file = self.client.files.create(
+            file=("reviews.jsonl", "\n".join(requests).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    def wait_for_batch(self, batch_id: str, poll_interval: float = 30.0) -> List[Dict]:
+        """Poll a batch from submit_batch until it finishes; return one review dict per prompt, in order."""
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                break
+            time.sleep(poll_interval)
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch_id} ended with status '{batch.status}'")
+
+        reviews = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                content = response["body"]["choices"][0]["message"]["content"]
+                try:
+                    reviews[int(record["custom_id"])] = self._parse_review(content)
+                except Exception as e:
+                    # One unparseable reply must not discard the rest of the batch
+                    reviews[int(record["custom_id"])] = {'overall_score': None, 'overall_comment': f"Error during review: {str(e)}", 'sections': []}
+            else:
+                error = record.get("error") or response.get("body", {}).get("error")
+                reviews[int(record["custom_id"])] = {'overall_score': None, 'overall_comment': f"Error during review: {error}", 'sections': []}
+        # Requests that failed outright only appear in the batch's error file
+        return [
+            reviews.get(i, {'overall_score': None, 'overall_comment': "Error during review: no result in batch output", 'sections': []})
+            for i in range(batch.request_counts.total)
+        ]
+
+    @staticmethod
+    def _review_messages(prompt: str) -> List[Dict]:
+        return [
+            {"role": "system", "content": REVIEW_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    @staticmethod
+    def _cache_key(messages: List[Dict]) -> str:
+        return LLMCache.make_key(AI_MODEL, messages[0]["content"], messages[1]["content"], 0.7)
+
+    def _parse_and_cache(self, content: str, cache_key: str) -> Dict:
+        """Parse a review reply, caching it only if it actually contained the JSON object."""
+        review = self._load_review_json(content)
+        if review is None:
+            # Not cached: a resampled reply may well be valid JSON
+            return {'overall_score': None, 'overall_comment': content, 'sections': []}
+        self.cache.set(cache_key, review)
+        return review
+
+    @staticmethod
+    def _parse_review(content: str) -> Dict:
+        review = AIService._load_review_json(content)
+        if review is None:
+            return {'overall_score': None, 'overall_comment': content, 'sections': []}
+        return review
+
+    @staticmethod
+    def _load_review_json(content: str) -> Optional[Dict]:
+        """The JSON object in a review reply, or None if the reply contains none."""
+        # Try to parse the response as JSON
+        try:
+            return json.loads(content)
+        except Exception:
+            # If the response is not valid JSON, try to extract JSON from the text
+            match = extract_json(content)
+            if match:
+                return json.loads(match)
+            return None
+
     def _analyze_chunk(self, chunk: str, position: int) -> List[Annotation]:
         """Analyze a chunk of text and generate annotations."""
         try:
-            response = openai.ChatCompletion.create(
+            response = self.client.chat.completions.create(
                 model=AI_MODEL,
                 messages=[
-                    {"role": "system", "content": "You are a technical specification reviewer. Review the following text and provide annotations. Focus on clarity, completeness, and technical accuracy."},
+                    {"role": "system", "content": CHUNK_REVIEW_SYSTEM_PROMPT},
                     {"role": "user", "content": chunk}
                 ],
                 temperature=0.7,
@@ -90,13 +242,55 @@ class AIService:
             print(f"Error analyzing chunk: {str(e)}")
             return []
 
+    async def review_all(self, chunks: List[str]) -> List[Annotation]:
+        """Analyze all chunks concurrently through the rate-limited request pool, keeping chunk order."""
+        futures = [
+            self.request_pool.enqueue(
+                lambda chunk=chunk, position=position: self._request_chunk_annotation(chunk, position),
+                self._estimate_tokens(chunk, max_tokens=500)
+            )
+            for position, chunk in enumerate(chunks)
+        ]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        annotations = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error analyzing chunk: {str(result)}")
+            else:
+                annotations.extend(result)
+        return annotations
+
+    async def _request_chunk_annotation(self, chunk: str, position: int) -> List[Annotation]:
+        # Async variant of _analyze_chunk; raises on API errors so the request pool can retry them
+        response = await self.async_client.chat.completions.create(
+            model=AI_MODEL,
+            messages=[
+                {"role": "system", "content": CHUNK_REVIEW_SYSTEM_PROMPT},
+                {"role": "user", "content": chunk}
+            ],
+            temperature=0.7,
+            max_tokens=500
+        )
+        content = response.choices[0].message.content
+        return [Annotation(
+            position=position,
+            comment=content,
+            severity="info",
+            category="review"
+        )]
+
+    @staticmethod
+    def _estimate_tokens(text: str, max_tokens: int) -> int:
+        """Token budget a request consumes: the prompt's tokens plus the completion allowance."""
+        return len(_encoding(AI_MODEL).encode(text)) + max_tokens
+
     def _generate_summary(self, text: str) -> str:
         """Generate a summary of the document."""
         try:
-            response = openai.ChatCompletion.create(
+            response = self.client.chat.completions.create(
                 model=AI_MODEL,
                 messages=[
-                    {"role": "system", "content": "Provide a concise summary of the technical specification, highlighting key points and potential areas of concern."},
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
                     {"role": "user", "content": text}
                 ],
                 temperature=0.7,
@@ -107,25 +301,31 @@ class AIService:
             print(f"Error generating summary: {str(e)}")
             return "Error generating summary."
 
-    def _split_text(self, text: str, chunk_size: int = 1000) -> List[str]:
-        """Split text into manageable chunks."""
+    def _split_text(self, text: str, max_tokens: int = 3500) -> List[str]:
+        """Split text into chunks of whole paragraphs, each at most max_tokens tokens for AI_MODEL."""
         if not text:
             return []
             
-        # Split by paragraphs first
+        # Split by paragraphs first, then pack them greedily; cur_len counts each paragraph plus its separator
+        encoding = _encoding(AI_MODEL)
+        sep_tokens = len(encoding.encode('\n\n'))
         paragraphs = text.split('\n\n')
         chunks = []
-        current_chunk = ""
+        buf = []
+        cur_len = 0
         
         for paragraph in paragraphs:
-            if len(current_chunk) + len(paragraph) < chunk_size:
-                current_chunk += paragraph + "\n\n"
+            p_len = len(encoding.encode(paragraph))
+            if cur_len + p_len < max_tokens:
+                buf.append(paragraph)
+                cur_len += p_len + sep_tokens
             else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = paragraph + "\n\n"
+                if buf:
+                    chunks.append('\n\n'.join(buf).strip())
+                buf = [paragraph]
+                cur_len = p_len + sep_tokens
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        if buf:
+            chunks.append('\n\n'.join(buf).strip())
             
         return chunks 
\ No newline at end of file
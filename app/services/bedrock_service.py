@@ -1,30 +1,80 @@
 import json
-import boto3
+import aioboto3
 import logging
-from typing import Dict, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
 from botocore.config import Config
+from ..config import LLM_CACHE_PATH, LLM_CACHE_TTL_DAYS
+from .llm_cache import LLMCache, get_llm_cache
+from .prompts import REVIEW_SYSTEM_PROMPT
+from .response_parser import extract_json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Models that accept latency-optimized inference (also matched inside inference profile ids)
+LATENCY_OPTIMIZED_MODELS = (
+    "anthropic.claude-3-5-haiku",
+    "meta.llama3-1-70b-instruct",
+    "meta.llama3-1-405b-instruct",
+)
+
+# Claude models that support prompt caching on Bedrock
+PROMPT_CACHING_MODELS = (
+    "anthropic.claude-3-5-haiku",
+    "anthropic.claude-3-7-sonnet",
+    "anthropic.claude-sonnet-4",
+    "anthropic.claude-opus-4",
+)
+
+class LazyJson:
+    """Log argument that only serializes its value if the record is actually emitted."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, indent=2)
+
 class BedrockService:
-    def __init__(self, region_name: str = "us-east-1"):
-        """Initialize AWS Bedrock client."""
-        self.client = boto3.client(
+    def __init__(self, region_name: str = "us-east-1", latency_optimized: bool = True):
+        """
+        Initialize the async AWS Bedrock session.
+        latency_optimized requests Bedrock's latency-optimized inference; it is only sent
+        for models in LATENCY_OPTIMIZED_MODELS and silently skipped for the rest.
+        """
+        self.session = aioboto3.Session()
+        self.region_name = region_name
+        self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"  # Using Claude 3 Sonnet
+        self.latency_optimized = latency_optimized
+        self.cache = get_llm_cache(str(LLM_CACHE_PATH), LLM_CACHE_TTL_DAYS)
+        logger.info(f"Initialized BedrockService with region: {region_name}")
+
+    def client_factory(self):
+        """Return a new bedrock-runtime client context; use as `async with self.client_factory() as client`."""
+        # A client per request picks up refreshed credentials and stays on the caller's event loop
+        return self.session.client(
             'bedrock-runtime',
-            region_name=region_name,
+            region_name=self.region_name,
             config=Config(
                 retries=dict(
                     max_attempts=3
                 )
             )
         )
-        self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"  # Using Claude 3 Sonnet
-        logger.info(f"Initialized BedrockService with region: {region_name}")
 
-    def review_document(self, prompt: str) -> Tuple[Dict, Dict]:
-        """Send the structured prompt to Claude and return both request and response as dicts."""
+    async def review_document(
+        self,
+        prompt: str,
+        on_text: Optional[Callable[[str], None]] = None,
+        no_cache: bool = False
+    ) -> Tuple[Dict, Dict]:
+        """
+        Send the structured prompt to Claude and return both request and response as dicts.
+        If on_text is given, the response is streamed and on_text is called with each text delta as it arrives.
+        Responses are cached per prompt; no_cache skips the lookup and refreshes the entry.
+        """
         if not prompt:
             logger.warning("Empty prompt received")
             return (
@@ -37,34 +87,9 @@ class BedrockService:
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": 1500,
             "temperature": 0.7,
+            # The Messages API takes the system prompt as a top-level field, not as a message role
+            "system": self._system_content(),
             "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a technical specification reviewer. "
-                        "Return ONLY a valid JSON object with the following structure. "
-                        "Do not include any explanation or extra text outside the JSON.\n"
-                        "Example:\n"
-                        "{\n"
-                        "  \"overall_score\": 8,\n"
-                        "  \"overall_comment\": \"The document is well-structured.\",\n"
-                        "  \"sections\": [\n"
-                        "    {\n"
-                        "      \"header\": \"Introduction\",\n"
-                        "      \"score\": 5,\n"
-                        "      \"comment\": \"Clear and complete.\",\n"
-                        "      \"suggestions\": \"\"\n"
-                        "    },\n"
-                        "    {\n"
-                        "      \"header\": \"System Requirements\",\n"
-                        "      \"score\": 3,\n"
-                        "      \"comment\": \"Missing details on memory requirements.\",\n"
-                        "      \"suggestions\": \"Add more details on hardware.\"\n"
-                        "    }\n"
-                        "  ]\n"
-                        "}\n"
-                    )
-                },
                 {
                     "role": "user",
                     "content": prompt
@@ -73,42 +98,40 @@ class BedrockService:
         }
 
         # Log the request details
-        logger.info("=== Bedrock Request Details ===")
-        logger.info(f"Model ID: {self.model_id}")
-        logger.info("Request Body:")
-        logger.info(json.dumps(request_body, indent=2))
-        logger.info("=== End Request Details ===")
-
-        try:
-            # Make the API call to Bedrock
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(request_body)
-            )
+        logger.info(f"Bedrock request to model: {self.model_id}")
+        logger.debug("Request Body:\n%s", LazyJson(request_body))
 
-            # Log the response
-            logger.info("=== Bedrock Response ===")
-            logger.info(f"Response Status: {response['ResponseMetadata']['HTTPStatusCode']}")
-            response_body = json.loads(response['body'].read())
-            logger.info("Response Body:")
-            logger.info(json.dumps(response_body, indent=2))
-            logger.info("=== End Response ===")
+        cache_key = LLMCache.make_key(
+            self.model_id, REVIEW_SYSTEM_PROMPT, prompt, request_body["temperature"]
+        )
+        if not no_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Returning cached AI response")
+                return request_body, cached
 
-            content = response_body['content'][0]['text']
+        try:
+            async with self.client_factory() as client:
+                if on_text is None:
+                    content = await self._invoke(client, request_body)
+                else:
+                    content = await self._invoke_streaming(client, request_body, on_text)
 
             # Try to parse the response as JSON
             try:
                 ai_response = json.loads(content)
                 logger.info("Successfully parsed AI response as JSON")
+                self.cache.set(cache_key, ai_response)
             except Exception as e:
                 logger.warning(f"Failed to parse response as JSON: {str(e)}")
                 # If the response is not valid JSON, try to extract JSON from the text
-                import re
-                match = re.search(r'\{.*\}', content, re.DOTALL)
+                match = extract_json(content)
                 if match:
-                    ai_response = json.loads(match.group(0))
+                    ai_response = json.loads(match)
                     logger.info("Successfully extracted and parsed JSON from response")
+                    self.cache.set(cache_key, ai_response)
                 else:
+                    # Not cached: a resampled reply may well be valid JSON
                     logger.warning("Could not extract JSON from response")
                     ai_response = {'overall_score': None, 'overall_comment': content, 'sections': []}
 
@@ -120,4 +143,58 @@ class BedrockService:
             return (
                 request_body,
                 {'overall_score': None, 'overall_comment': f"Error during review: {str(e)}", 'sections': []}
-            ) 
\ No newline at end of file
+            )
+
+    def _system_content(self):
+        """The review system prompt, marked as a prompt-cache breakpoint on models that support it."""
+        if any(model in self.model_id for model in PROMPT_CACHING_MODELS):
+            return [{"type": "text", "text": REVIEW_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+        return REVIEW_SYSTEM_PROMPT
+
+    def _invoke_params(self, request_body: Dict) -> Dict:
+        """Keyword arguments shared by invoke_model and invoke_model_with_response_stream."""
+        params = {
+            'modelId': self.model_id,
+            'body': json.dumps(request_body)
+        }
+        if self.latency_optimized and any(model in self.model_id for model in LATENCY_OPTIMIZED_MODELS):
+            params['performanceConfigLatency'] = 'optimized'
+        return params
+
+    async def _invoke(self, client, request_body: Dict) -> str:
+        """Call invoke_model and return the completion text."""
+        # Make the API call to Bedrock
+        response = await client.invoke_model(**self._invoke_params(request_body))
+
+        # Log the response
+        logger.info(f"Bedrock Response Status: {response['ResponseMetadata']['HTTPStatusCode']}")
+        response_body = json.loads(await response['body'].read())
+        logger.debug("Response Body:\n%s", LazyJson(response_body))
+
+        return response_body['content'][0]['text']
+
+    async def _invoke_streaming(self, client, request_body: Dict, on_text: Callable[[str], None]) -> str:
+        """Stream the completion, forwarding text deltas to on_text, and return the full text."""
+        parts = []
+        async for text in self._stream_text(client, request_body):
+            parts.append(text)
+            on_text(text)
+        content = ''.join(parts)
+        logger.debug("Response Text:\n%s", content)
+
+        return content
+
+    async def _stream_text(self, client, request_body: Dict) -> AsyncIterator[str]:
+        """Call invoke_model_with_response_stream and yield text deltas as they arrive."""
+        response = await client.invoke_model_with_response_stream(**self._invoke_params(request_body))
+
+        logger.info(f"Bedrock Streaming Response Status: {response['ResponseMetadata']['HTTPStatusCode']}")
+        async for event in response['body']:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            payload = json.loads(chunk['bytes'])
+            if payload.get('type') == 'content_block_delta':
+                text = payload['delta'].get('text', '')
+                if text:
+                    yield text
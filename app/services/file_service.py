@@ -1,24 +1,74 @@
+import io
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional, Union, List, Dict
+from typing import Optional, Union, List, Dict, Tuple
 import PyPDF2
 import docx
-from ..config import UPLOAD_DIR, ALLOWED_EXTENSIONS, MAX_FILE_SIZE
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from ..config import UPLOAD_DIR, ALLOWED_EXTENSIONS, MAX_FILE_SIZE, USE_PYMUPDF
 from ..models.document import Document
 from app.models.structured_doc import SectionContent, DocumentStructure
 
+_PARAGRAPH_TAG = qn('w:p')
+_TABLE_TAG = qn('w:tbl')
+
+# Signature of each extension and how many leading bytes it must appear within. PDF readers
+# accept the header anywhere in the first 1024 bytes; .docx is a zip and must start with it.
+_MAGIC_BYTES = {
+    '.pdf': (b'%PDF', 1024),
+    '.docx': (b'PK\x03\x04', 4),
+}
+
+# PDFs with more pages than this are parsed across worker processes
+PARALLEL_PDF_MIN_PAGES = 20
+
+# Worker processes shared by every extraction; started on first use and kept for the process lifetime
+_PDF_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_PDF_EXECUTOR_LOCK = threading.Lock()
+
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    global _PDF_EXECUTOR
+    with _PDF_EXECUTOR_LOCK:
+        if _PDF_EXECUTOR is None:
+            # spawn avoids forking the server's threads
+            _PDF_EXECUTOR = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _PDF_EXECUTOR
+
+def _extract_page_range(args: Tuple[bytes, int, int]) -> str:
+    """Process-pool worker: text of pages [start, stop) of a PDF given as bytes."""
+    pdf_bytes, start, stop = args
+    pages = PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages
+    return "".join(pages[i].extract_text() or "" for i in range(start, stop))
+
 class FileService:
     @staticmethod
     def validate_file(file) -> bool:
-        """Validate file type and size."""
+        """Validate file type and size, and that the content carries the extension's signature."""
         if not file:
             return False
         
         file_extension = Path(file.name).suffix.lower()
-        return (
-            file_extension in ALLOWED_EXTENSIONS and
-            file.size <= MAX_FILE_SIZE
-        )
+        if file_extension not in ALLOWED_EXTENSIONS or file.size > MAX_FILE_SIZE:
+            return False
+        
+        # Reject renamed or corrupt uploads before an extractor tries to parse them
+        signature = _MAGIC_BYTES.get(file_extension)
+        if signature is None:
+            return True
+        magic, window = signature
+        # The upload may already have been read, so sniff from the start and rewind again
+        file.seek(0)
+        head = file.read(window)
+        file.seek(0)
+        return magic in head
 
     @staticmethod
     def extract_text(file) -> Optional[Union[str, List[Union[str, Dict]]]]:
@@ -38,41 +88,40 @@ class FileService:
 
     @staticmethod
     def _extract_from_pdf(file) -> str:
-        text = ""
+        if USE_PYMUPDF:
+            # Optional C-backed parser, several times faster on large PDFs; not in requirements.txt
+            import pymupdf
+            with pymupdf.open(stream=file.getvalue(), filetype='pdf') as pdf:
+                return "".join(page.get_text() for page in pdf)
         pdf_reader = PyPDF2.PdfReader(file)
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
+        n_pages = len(pdf_reader.pages)
+        workers = min(os.cpu_count() or 1, n_pages // PARALLEL_PDF_MIN_PAGES + 1)
+        if n_pages > PARALLEL_PDF_MIN_PAGES and workers > 1:
+            # Parsing is CPU-bound, so split contiguous page ranges across processes. Each worker
+            # re-opens the PDF once for its whole range
+            pdf_bytes = file.getvalue()
+            step = -(-n_pages // workers)
+            ranges = [(pdf_bytes, start, min(start + step, n_pages)) for start in range(0, n_pages, step)]
+            return "".join(_get_pdf_executor().map(_extract_page_range, ranges))
+        return "".join(page.extract_text() or "" for page in pdf_reader.pages)
 
     @staticmethod
     def _extract_from_docx(file) -> List[Union[str, Dict]]:
         doc = docx.Document(file)
         content_blocks = []
-        # Track where we are in the doc (paragraphs and tables are interleaved)
-        para_idx, table_idx = 0, 0
-        total_paras = len(doc.paragraphs)
-        total_tables = len(doc.tables)
-        # Build a flat list of (type, obj) in document order
-        elements = []
-        for block in doc.element.body:
-            if block.tag.endswith('}p'):
-                elements.append(('p', doc.paragraphs[para_idx]))
-                para_idx += 1
-            elif block.tag.endswith('}tbl'):
-                elements.append(('t', doc.tables[table_idx]))
-                table_idx += 1
-        for typ, obj in elements:
-            if typ == 'p':
-                text = obj.text.strip()
+        # Paragraphs and tables are interleaved; walk the body once and wrap each element in place
+        for block in doc.element.body.iterchildren():
+            if block.tag == _PARAGRAPH_TAG:
+                text = Paragraph(block, doc).text.strip()
                 if text:
                     content_blocks.append(text)
-            elif typ == 't':
+            elif block.tag == _TABLE_TAG:
                 # Extract table as list of lists and as text
-                table_data = [[cell.text.strip() for cell in row.cells] for row in obj.rows]
+                table_data = [[cell.text.strip() for cell in row.cells] for row in Table(block, doc).rows]
                 table_text = '\n'.join(['\t'.join(row) for row in table_data])
                 content_blocks.append({
                     'type': 'table',
                     'text': table_text,
                     'data': table_data
                 })
-        return content_blocks 
\ No newline at end of file
+        return content_blocks
\ No newline at end of file
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    """
+    Persistent cache of parsed LLM responses, keyed on a SHA-256 of the request that produced them.
+    Backed by a single SQLite table in WAL mode so concurrent review threads can read while one writes.
+    """
+
+    def __init__(self, path: Union[str, Path], ttl_days: int = 7):
+        self.path = str(path)
+        self.ttl_seconds = ttl_days * 24 * 60 * 60
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS cache (hash TEXT PRIMARY KEY, response BLOB, ts INT)")
+                conn.execute("CREATE INDEX IF NOT EXISTS cache_ts ON cache (ts)")
+                self._purge_expired(conn)
+        except sqlite3.Error as e:
+            # An unusable cache only costs the speedup; get/set then behave as misses
+            logger.warning(f"LLM cache unavailable at {self.path}: {str(e)}")
+
+    @staticmethod
+    def make_key(model_id: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+        """SHA-256 of the canonical JSON of everything that determines the response."""
+        canonical = json.dumps(
+            {
+                "model_id": model_id,
+                "system_prompt": system_prompt,
+                "user_prompt": user_prompt,
+                "temperature": temperature
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached response for key, or None if it is missing or older than the TTL."""
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT response, ts FROM cache WHERE hash = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {str(e)}")
+            return None
+        if row is None or row[1] < time.time() - self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict):
+        """Store a response under key, replacing any previous entry and dropping expired ones."""
+        try:
+            with self._connect() as conn:
+                self._purge_expired(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (hash, response, ts) VALUES (?, ?, ?)",
+                    (key, json.dumps(value).encode("utf-8"), int(time.time()))
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _purge_expired(self, conn: sqlite3.Connection):
+        # get() already ignores these rows; deleting them keeps the file from growing without bound
+        conn.execute("DELETE FROM cache WHERE ts < ?", (int(time.time() - self.ttl_seconds),))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per call: reviews run on worker threads and sqlite3 connections are not shareable
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+@lru_cache(maxsize=None)
+def get_llm_cache(path: str, ttl_days: int) -> LLMCache:
+    """Process-wide LLMCache per (path, TTL), so services rebuilt on every rerun skip the SQLite setup."""
+    return LLMCache(path, ttl_days=ttl_days)
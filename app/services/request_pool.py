@@ -0,0 +1,111 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Tuple, Type
+
+@dataclass
+class _Job:
+    call: Callable[[], Awaitable[Any]]
+    token_cost: int
+    future: asyncio.Future
+    attempts_left: int
+    attempt: int = 0
+
+class RequestPool:
+    """
+    Rate-limited runner for async API calls, after the OpenAI cookbook's api_request_parallel_processor.
+
+    Two token buckets (requests and tokens per minute) refill continuously; a queued call is only
+    started once both buckets can cover it and fewer than max_in_flight calls are running.
+    Calls failing with one of retry_on are requeued with jittered exponential backoff, and a
+    rate_limit_on error additionally pauses the whole pool for a while.
+    """
+
+    def __init__(
+        self,
+        max_requests_per_minute: float,
+        max_tokens_per_minute: float,
+        max_in_flight: int = 50,
+        max_attempts: int = 5,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+        rate_limit_on: Tuple[Type[BaseException], ...] = (),
+        base_backoff: float = 1.0,
+        rate_limit_pause: float = 15.0
+    ):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.max_in_flight = max_in_flight
+        self.max_attempts = max_attempts
+        self.retry_on = retry_on
+        self.rate_limit_on = rate_limit_on
+        self.base_backoff = base_backoff
+        self.rate_limit_pause = rate_limit_pause
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight = 0
+        self._paused_until = 0.0
+
+    def enqueue(self, call: Callable[[], Awaitable[Any]], token_cost: int) -> asyncio.Future:
+        """Queue a call (a zero-argument coroutine factory) and return a future for its result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        # A call larger than the whole token budget would otherwise wait forever
+        cost = min(token_cost, self.max_tokens_per_minute)
+        self._queue.put_nowait(_Job(call=call, token_cost=cost, future=future, attempts_left=self.max_attempts))
+        return future
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # Queues and tasks belong to one event loop; start fresh on a new one
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._in_flight = 0
+            self._worker = loop.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        request_capacity = self.max_requests_per_minute
+        token_capacity = self.max_tokens_per_minute
+        last_update = time.monotonic()
+        while True:
+            job = await self._queue.get()
+            while True:
+                now = time.monotonic()
+                elapsed = now - last_update
+                last_update = now
+                request_capacity = min(self.max_requests_per_minute, request_capacity + self.max_requests_per_minute * elapsed / 60.0)
+                token_capacity = min(self.max_tokens_per_minute, token_capacity + self.max_tokens_per_minute * elapsed / 60.0)
+                if (
+                    now >= self._paused_until
+                    and request_capacity >= 1
+                    and token_capacity >= job.token_cost
+                    and self._in_flight < self.max_in_flight
+                ):
+                    break
+                await asyncio.sleep(max(self._paused_until - now, 0.05))
+            request_capacity -= 1
+            token_capacity -= job.token_cost
+            self._in_flight += 1
+            self._loop.create_task(self._attempt(job))
+
+    async def _attempt(self, job: _Job):
+        try:
+            result = await job.call()
+        except Exception as e:
+            job.attempt += 1
+            job.attempts_left -= 1
+            if job.attempts_left > 0 and isinstance(e, self.retry_on):
+                if isinstance(e, self.rate_limit_on):
+                    self._paused_until = max(self._paused_until, time.monotonic() + self.rate_limit_pause)
+                self._in_flight -= 1
+                await asyncio.sleep(self.base_backoff * 2 ** (job.attempt - 1) * (1 + random.random()))
+                self._queue.put_nowait(job)
+                return
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        self._in_flight -= 1
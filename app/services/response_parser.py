@@ -0,0 +1,24 @@
+import re
+from typing import Optional
+
+# A whole JSON string literal (escapes included) or a single brace
+_JSON_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[{}]', re.DOTALL)
+
+def extract_json(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} object embedded in text, or None if there is none.
+    Scans once from the first '{', counting braces and skipping over string literals.
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    depth = 0
+    for match in _JSON_TOKEN_RE.finditer(text, start):
+        token = match.group()
+        if token == '{':
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:match.end()]
+    return None